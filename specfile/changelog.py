@@ -9,7 +9,7 @@ import pwd
 import re
 import shutil
 import subprocess
-from typing import List, Optional, Union, overload
+from typing import Dict, List, Optional, Union, overload
 
 from specfile.exceptions import SpecfileException
 from specfile.formatter import formatted
@@ -398,18 +398,20 @@ def guess_packager() -> str:
     fullname: str = ""
 
     if shutil.which("git"):
-        email = subprocess.run(
-            ["git", "config", "user.email"],
+        # get both values at once, spawning a process is expensive
+        output = subprocess.run(
+            ["git", "config", "--null", "--get-regexp", r"^user\.(name|email)$"],
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             universal_newlines=True,
-        ).stdout.strip()
-        fullname = subprocess.run(
-            ["git", "config", "user.name"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            universal_newlines=True,
-        ).stdout.strip()
+        ).stdout
+        config: Dict[str, str] = {}
+        for item in output.split("\0"):
+            # in case of multiple values the last one takes precedence
+            key, _, value = item.partition("\n")
+            config[key] = value
+        email = config.get("user.email", "").strip()
+        fullname = config.get("user.name", "").strip()
     if not fullname:
         fullname = _getent_name()
 
@@ -89,8 +89,7 @@ def process_conditions(
 
     excluded_lines = []
     if macro_definitions:
-        for md in macro_definitions:
-            position = md.get_position(macro_definitions)
+        for md, position in macro_definitions.with_positions():
             excluded_lines.append(range(position, position + len(md.body.split("\n"))))
     condition_regex = re.compile(
         r"""
@@ -119,11 +118,15 @@ def process_conditions(
         if any(index in r for r in excluded_lines):
             result.append((line, branches[-1]))
             continue
-        try:
-            expanded_line = expand(line)
-        except RPMException:
-            # ignore failed expansion and use the original line
+        if not line.lstrip().startswith("%"):
+            # expansion of such line can't produce a condition keyword
             expanded_line = line
+        else:
+            try:
+                expanded_line = expand(line)
+            except RPMException:
+                # ignore failed expansion and use the original line
+                expanded_line = line
         m = condition_regex.match(expanded_line)
         if not m:
             result.append((line, branches[-1]))
@@ -4,7 +4,7 @@
 import copy
 import re
 from enum import Enum, auto
-from typing import TYPE_CHECKING, List, Optional, Tuple, Union, overload
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple, Union, overload
 
 from specfile.conditions import process_conditions
 from specfile.formatter import formatted
@@ -282,6 +282,21 @@ class MacroDefinitions(UserList[MacroDefinition]):
             raise ValueError
         return first_match
 
+    def with_positions(self) -> Iterator[Tuple[MacroDefinition, int]]:
+        """
+        Iterates over macro definitions along with their positions in the spec file.
+
+        This is equivalent to calling `MacroDefinition.get_position()` for every
+        macro definition, but the positions are determined in a single pass.
+
+        Yields:
+            Tuples in the form of (macro definition, position).
+        """
+        offset = 0
+        for macro_definition in self.data:
+            yield macro_definition, offset + len(macro_definition._preceding_lines)
+            offset += len(macro_definition.get_raw_data())
+
     @classmethod
     def _parse(
         cls, lines: Union[List[str], List[Tuple[str, bool]]]
@@ -4,7 +4,7 @@
 import collections
 import copy
 import re
-from typing import TYPE_CHECKING, List, Optional, Union, cast, overload
+from typing import TYPE_CHECKING, List, Optional, Set, Union, cast, overload
 
 from specfile.constants import (
     SCRIPT_SECTIONS,
@@ -26,6 +26,12 @@ if TYPE_CHECKING:
 # name for the implicit "preamble" section
 PREAMBLE = "package"
 
+# compile the regex only once, it is used for every line of every parsed spec file
+SECTION_ID_REGEX = re.compile(
+    rf"^%({'|'.join(re.escape(n) for n in SECTION_NAMES)})(\s+.*(?<!\\)$|$)",
+    re.IGNORECASE,
+)
+
 
 class Section(collections.UserList):
     """
@@ -296,25 +302,15 @@ class Sections(UserList[Section]):
                 return name, options, delimiter, separator, content
             return tokens[0], None, "", separator, content
 
-        excluded_lines = []
-        macro_definitions = MacroDefinitions.parse(lines)
-        for md in macro_definitions:
-            position = md.get_position(macro_definitions)
-            excluded_lines.append(range(position, position + len(md.body.split("\n"))))
-        section_id_regexes = [
-            re.compile(rf"^%{re.escape(n)}(\s+.*(?<!\\)$|$)", re.IGNORECASE)
-            for n in SECTION_NAMES
-        ]
+        excluded_lines: Set[int] = set()
+        for md, position in MacroDefinitions.parse(lines).with_positions():
+            excluded_lines.update(range(position, position + len(md.body.split("\n"))))
         section_starts = []
         for i, line in enumerate(lines):
             # section can not start inside macro definition body
-            if any(i in r for r in excluded_lines):
-                continue
-            if line.startswith("%"):
-                for r in section_id_regexes:
-                    if r.match(line):
-                        section_starts.append(i)
-                        break
+            if line.startswith("%") and i not in excluded_lines:
+                if SECTION_ID_REGEX.match(line):
+                    section_starts.append(i)
         section_starts.append(len(lines))
         data = [Section(PREAMBLE, data=lines[: section_starts[0]])]
         for start, end in zip(section_starts, section_starts[1:]):
@@ -138,8 +138,9 @@ class Sourcelist(UserList[SourcelistEntry]):
         Returns:
             New instance of `Sourcelist` class.
         """
-        macro_definitions = MacroDefinitions.parse(list(section))
-        lines = process_conditions(list(section), macro_definitions, context)
+        section_lines = list(section)
+        macro_definitions = MacroDefinitions.parse(section_lines)
+        lines = process_conditions(section_lines, macro_definitions, context)
         data = []
         buffer: List[str] = []
         for line, valid in lines:
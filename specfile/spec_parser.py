@@ -3,10 +3,8 @@
 
 import contextlib
 import copy
-import hashlib
 import logging
 import os
-import pickle
 import re
 import tempfile
 from pathlib import Path
@@ -43,8 +41,8 @@ class SpecParser:
             and were replaced with dummy files.
     """
 
-    # hash of input parameters to the last parse performed
-    _last_parse_hash = None
+    # input parameters of the last parse performed
+    _last_parse_input = None
 
     def __init__(
         self,
@@ -57,10 +55,10 @@ class SpecParser:
         self.force_parse = force_parse
         self.spec = None
         self.tainted = False
-        # explicitly invalidate the global parse hash, this `SpecParser` instance could have
+        # explicitly invalidate the global parse input, this `SpecParser` instance could have
         # been assigned the same id as a previously deleted one and parsing could be
         # improperly skipped
-        SpecParser._last_parse_hash = None
+        SpecParser._last_parse_input = None
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, SpecParser):
@@ -364,19 +362,17 @@ class SpecParser:
         Raises:
             RPMException: If parsing error occurs.
         """
-        # calculate hash of all input parameters
-        payload = (
+        # collect all input parameters, comparing them directly is cheaper
+        # than serializing and hashing the whole content on every call
+        parse_input = (
             self.id(),
             self.sourcedir,
-            self.macros,
+            copy.deepcopy(self.macros),
             self.force_parse,
             content,
-            extra_macros,
+            copy.deepcopy(extra_macros),
         )
-        parse_hash = hashlib.sha256(
-            pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
-        ).digest()
-        if parse_hash == SpecParser._last_parse_hash:
+        if parse_input == SpecParser._last_parse_input:
             # none of the input parameters has changed, no need to parse again
             return
         if self.spec:
@@ -386,10 +382,10 @@ class SpecParser:
             try:
                 self.spec, self.tainted = self._do_parse(content, extra_macros)
             except Exception:
-                SpecParser._last_parse_hash = None
+                SpecParser._last_parse_input = None
                 raise
             else:
-                SpecParser._last_parse_hash = parse_hash
+                SpecParser._last_parse_input = parse_input
         except RPMException:
             self.spec = None
             self.tainted = False
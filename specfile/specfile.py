@@ -1,13 +1,15 @@
 # Copyright Contributors to the Packit project.
 # SPDX-License-Identifier: MIT
 
+import bisect
 import datetime
 import logging
+import os
 import re
 import types
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Generator, List, Optional, Tuple, Type, Union, cast
+from typing import Dict, Generator, List, Optional, Set, Tuple, Type, Union, cast
 
 import rpm
 
@@ -41,6 +43,31 @@ from specfile.value_parser import (
 
 logger = logging.getLogger(__name__)
 
+# dist suffix (%dist, %{dist} or %{?dist}) optionally followed by minorbump
+DIST_SUFFIX_REGEX = re.compile(r"(%(?P<m>\{\??)?dist(?(m)\}))(\.(\d+))?$")
+
+# release number optionally preceded by %release_func or "0.", see rpmdev-bumpspec
+RELEASE_NUMBER_REGEX = re.compile(
+    r"^(?P<func>%release_func\s+)?(?P<pre>0\.)?(?P<rel>\d+)(?P<post>.*)$"
+)
+
+# release string ending with a number
+TRAILING_RELEASE_NUMBER_REGEX = re.compile(r"^(?P<pre>.+\.)(?P<rel>\d+)$")
+
+
+@dataclass
+class _Entity:
+    """Macro definition or tag examined by `Specfile.update_value()`."""
+
+    name: str
+    value: str
+    type: Type
+    position: int
+    disabled: bool = False
+    locked: bool = False
+    updated: bool = False
+    flip_pending: bool = False
+
 
 class Specfile:
     """
@@ -57,6 +84,7 @@ class Specfile:
         autosave: bool = False,
         macros: Optional[List[Tuple[str, Optional[str]]]] = None,
         force_parse: bool = False,
+        skip_parsing: bool = False,
     ) -> None:
         """
         Initializes a specfile object.
@@ -70,15 +98,21 @@ class Specfile:
                 sources required to be present at parsing time are not available.
                 Such sources include sources referenced from shell expansions
                 in tag values and sources included using the _%include_ directive.
+            skip_parsing: Do not parse the spec file on initialization, defer parsing
+                until it is actually needed, e.g. for macro expansion. Any parsing errors
+                will be raised at that point. Useful when only the raw content of the spec file
+                is going to be accessed or modified.
         """
         self.autosave = autosave
         self._path = Path(path)
-        self._lines, self._trailing_newline = self._read_lines(self._path)
+        self._saved_state: Optional[Tuple[Path, str, int, int]] = None
+        self._read()
         self._parser = SpecParser(
             Path(sourcedir or self.path.parent), macros, force_parse
         )
-        self._parser.parse(str(self))
-        self._dump_debug_info("After initial parsing")
+        if not skip_parsing:
+            self._parser.parse(str(self))
+            self._dump_debug_info("After initial parsing")
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, Specfile):
@@ -112,6 +146,9 @@ class Specfile:
         self.save()
 
     def _dump_debug_info(self, message) -> None:
+        if not logger.isEnabledFor(logging.DEBUG):
+            # avoid formatting the message, repr() of rpm.spec is not cheap
+            return
         logger.debug(
             f"DBG: {message}:\n"
             f"  {self!r} @ 0x{id(self):012x}\n"
@@ -119,10 +156,46 @@ class Specfile:
             f"  {self._parser.spec!r} @ 0x{id(self._parser.spec):012x}"
         )
 
-    @staticmethod
-    def _read_lines(path: Path) -> Tuple[List[str], bool]:
-        content = path.read_text(encoding="utf8", errors="surrogateescape")
-        return content.splitlines(), content[-1] == "\n"
+    def _read(self) -> None:
+        # stat before reading, so that a concurrent modification shows up
+        # as a mismatch rather than being recorded as saved
+        stat = self.path.stat()
+        content = self.path.read_text(encoding="utf8", errors="surrogateescape")
+        self._trailing_newline = content.endswith("\n")
+        # str.split() doesn't have to look for other line boundaries like splitlines()
+        body = content[:-1] if self._trailing_newline else content
+        self._lines = body.split("\n") if content else []
+        self._update_saved_state(content, stat)
+
+    def _update_saved_state(self, content: str, stat: os.stat_result) -> None:
+        # remember what is stored on disk, so that unnecessary autosaves can be avoided
+        self._saved_state = (self.path, content, stat.st_mtime_ns, stat.st_size)
+
+    def _is_saved(self, content: str) -> bool:
+        if self._saved_state is None:
+            return False
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return False
+        return self._saved_state == (
+            self.path,
+            content,
+            stat.st_mtime_ns,
+            stat.st_size,
+        )
+
+    def _write(self, content: str) -> None:
+        self.path.write_text(content, encoding="utf8", errors="surrogateescape")
+        self._update_saved_state(content, self.path.stat())
+
+    def _autosave(self) -> None:
+        # context managers autosave on every exit, including read-only access,
+        # skip the write if nothing changed since the last read or write
+        # (explicit save() always writes, stat can miss a quick external change)
+        content = str(self)
+        if not self._is_saved(content):
+            self._write(content)
 
     @property
     def path(self) -> Path:
@@ -179,11 +252,11 @@ class Specfile:
 
     def reload(self) -> None:
         """Reloads the spec file content."""
-        self._lines, self._trailing_newline = self._read_lines(self.path)
+        self._read()
 
     def save(self) -> None:
         """Saves the spec file content."""
-        self.path.write_text(str(self), encoding="utf8", errors="surrogateescape")
+        self._write(str(self))
 
     def expand(
         self,
@@ -233,7 +306,7 @@ class Specfile:
             yield self._lines
         finally:
             if self.autosave:
-                self.save()
+                self._autosave()
 
     @ContextManager
     def macro_definitions(self) -> Generator[MacroDefinitions, None, None]:
@@ -344,6 +417,30 @@ class Specfile:
                 finally:
                     section.data = prep.get_raw_section_data()
 
+    @staticmethod
+    def _get_sections(
+        sections: Sections, name: str, normalized: bool = False
+    ) -> List[Section]:
+        """
+        Gets all sections with the specified name and no options.
+
+        Args:
+            sections: `Sections` instance to look in.
+            name: Name of the sections.
+            normalized: Whether to compare normalized names and IDs.
+
+        Returns:
+            List of matching sections.
+        """
+        # compare names first, constructing ID of every section is expensive
+        if normalized:
+            return [
+                s
+                for s in sections
+                if s.normalized_name == name and s.normalized_id == name
+            ]
+        return [s for s in sections if s.name == name and s.id == name]
+
     @ContextManager
     def sources(
         self,
@@ -364,25 +461,20 @@ class Specfile:
         """
         with self.sections() as sections, self.tags() as tags:
             sourcelists = [
-                (s, Sourcelist.parse(s, context=self))
-                for s in sections
-                if s.id == "sourcelist"
+                Sourcelist.parse(s, context=self)
+                for s in self._get_sections(sections, "sourcelist")
             ]
             try:
                 yield Sources(
                     tags,
-                    (
-                        cast(List[Sourcelist], list(zip(*sourcelists))[1])
-                        if sourcelists
-                        else []
-                    ),
+                    sourcelists,
                     allow_duplicates,
                     default_to_implicit_numbering,
                     default_source_number_digits,
                     context=self,
                 )
             finally:
-                for section, sourcelist in sourcelists:
+                for section, sourcelist in zip(sourcelist_sections, sourcelists):
                     section.data = sourcelist.get_raw_section_data()
 
     @ContextManager
@@ -405,31 +497,42 @@ class Specfile:
         """
         with self.sections() as sections, self.tags() as tags:
             patchlists = [
-                (s, Sourcelist.parse(s, context=self))
-                for s in sections
-                if s.id == "patchlist"
+                Sourcelist.parse(s, context=self)
+                for s in self._get_sections(sections, "patchlist")
             ]
             try:
                 yield Patches(
                     tags,
-                    (
-                        cast(List[Sourcelist], list(zip(*patchlists))[1])
-                        if patchlists
-                        else []
-                    ),
+                    patchlists,
                     allow_duplicates,
                     default_to_implicit_numbering,
                     default_source_number_digits,
                     context=self,
                 )
             finally:
-                for section, patchlist in patchlists:
+                for section, patchlist in zip(patchlist_sections, patchlists):
                     section.data = patchlist.get_raw_section_data()
 
     @property
     def has_autorelease(self) -> bool:
         """Whether the spec file uses _%autorelease_."""
-        for node in ValueParser.flatten(ValueParser.parse(self.raw_release)):
+        return self._contains_autorelease(self.raw_release)
+
+    @staticmethod
+    def _contains_autorelease(raw_release: Optional[str]) -> bool:
+        """
+        Determines if the specified raw release string contains _%autorelease_.
+
+        Args:
+            raw_release: Raw release string.
+
+        Returns:
+            `True` if the string contains _%autorelease_, `False` otherwise.
+        """
+        if not raw_release or "autorelease" not in raw_release:
+            # no need to parse the value
+            return False
+        for node in ValueParser.flatten(ValueParser.parse(raw_release)):
             if (
                 isinstance(node, (MacroSubstitution, EnclosedMacroSubstitution))
                 and node.name == "autorelease"
@@ -449,6 +552,9 @@ class Specfile:
             `True` if the section contains _%autochangelog_, `False` otherwise.
         """
         for line in section:
+            if "autochangelog" not in line:
+                # no need to parse the line
+                continue
             if line.lstrip().startswith("#"):
                 # skip comments
                 continue
@@ -469,12 +575,34 @@ class Specfile:
         """Whether the spec file uses _%autochangelog_."""
         with self.sections() as sections:
             # there could be multiple changelog sections, consider all of them
-            for section in sections:
-                if not section.normalized_id == "changelog":
-                    continue
-                if self.contains_autochangelog(section):
-                    return True
-            return False
+            return any(
+                self.contains_autochangelog(section)
+                for section in self._get_sections(
+                    sections, "changelog", normalized=True
+                )
+            )
+
+    def _expand_changelog_evr(self, evr: Optional[str] = None) -> str:
+        """
+        Expands EVR for a new changelog entry, with the dist suffix removed.
+
+        Args:
+            evr: EVR to expand. If not set, it is determined from the current
+                _%{epoch}_, _%{version}_, and _%{release}_ values.
+
+        Returns:
+            Expanded EVR.
+        """
+        if evr is None:
+            release, dist, minorbump = self._split_raw_release(self.raw_release or "")
+            if dist and "dist" not in release:
+                # the common case, dist is only a suffix of the raw release string;
+                # strip it here to avoid reparsing the spec file with dist undefined
+                if minorbump is not None:
+                    release += f".{minorbump}"
+                return self.expand(f"%{{?epoch:%{{epoch}}:}}%{{version}}-{release}")
+            evr = "%{?epoch:%{epoch}:}%{version}-%{release}"
+        return self.expand(evr, extra_macros=[("dist", "")])
 
     def add_changelog_entry(
         self,
@@ -502,19 +630,18 @@ class Specfile:
                 determines the appropriate value based on the spec file current
                 _%{epoch}_, _%{version}_, and _%{release}_ values.
         """
+        expanded_evr = None
         with self.sections() as sections:
             # there could be multiple changelog sections, update all of them
-            for section in sections:
-                if not section.normalized_id == "changelog":
-                    continue
+            for section in self._get_sections(sections, "changelog", normalized=True):
                 if self.contains_autochangelog(section):
                     continue
-                if evr is None:
-                    evr = "%{?epoch:%{epoch}:}%{version}-%{release}"
-                with self.changelog(section) as changelog:
-                    if changelog is None:
-                        return
-                    evr = self.expand(evr, extra_macros=[("dist", "")])
+                # parse the section directly, passing it to changelog() would mean
+                # serializing its whole content to look up the context manager
+                changelog = Changelog.parse(section)
+                try:
+                    if expanded_evr is None:
+                        expanded_evr = self._expand_changelog_evr(evr)
                     if isinstance(entry, str):
                         entry = [entry]
                     if timestamp is None:
@@ -532,11 +659,13 @@ class Specfile:
                     elif email is not None:
                         author += f" <{email}>"
                     if changelog:
-                        # try to preserve padding of day of month
-                        padding = max(
-                            (e.day_of_month_padding for e in reversed(changelog)),
-                            key=len,
-                        )
+                        # try to preserve padding of day of month, the most recent
+                        # entry with a detectable padding wins
+                        padding = ""
+                        for e in reversed(changelog):
+                            padding = e.day_of_month_padding
+                            if padding:
+                                break
                     else:
                         padding = "0"
                     changelog.append(
@@ -544,11 +673,13 @@ class Specfile:
                             timestamp,
                             author,
                             entry,
-                            evr,
+                            expanded_evr,
                             day_of_month_padding=padding,
                             append_newline=bool(changelog),
                         )
                     )
+                finally:
+                    section.data = changelog.get_raw_section_data()
 
     def _tag(name: str, doc: str) -> property:  # type: ignore[misc]
         """
@@ -632,7 +763,15 @@ class Specfile:
         Returns:
             Tuple of (release, dist, minorbump).
         """
-        tokens = re.split(r"(%(?P<m>\{\??)?dist(?(m)\}))(\.(\d+))?$", raw_release)
+        # fast path for the most common forms
+        release, minorbump = raw_release, None
+        head, _, tail = raw_release.rpartition(".")
+        if tail.isdecimal():
+            release, minorbump = head, int(tail)
+        for dist in ("%{?dist}", "%{dist}", "%dist"):
+            if release.endswith(dist):
+                return release[: -len(dist)], dist, minorbump
+        tokens = DIST_SUFFIX_REGEX.split(raw_release)
         if len(tokens) == 1:
             return tokens[0], None, None
         release, dist, _, _, minorbump, *_ = tokens
@@ -738,6 +877,9 @@ class Specfile:
         Returns:
             Updated value. Can be equal to the original value.
         """
+        if value == requested_value or "%" not in value:
+            # nothing to do or nothing to preserve, avoid collecting entities
+            return requested_value
 
         def expand(s):
             result = self.expand(s, skip_parsing=getattr(expand, "skip_parsing", False))
@@ -745,17 +887,6 @@ class Specfile:
             expand.skip_parsing = True
             return result
 
-        @dataclass
-        class Entity:
-            name: str
-            value: str
-            type: Type
-            position: int
-            disabled: bool = False
-            locked: bool = False
-            updated: bool = False
-            flip_pending: bool = False
-
         protected_regex = re.compile(
             # (?!) doesn't match anything
             protected_entities or "(?!)",
@@ -764,78 +895,81 @@ class Specfile:
         # collect modifiable entities
         entities = []
         with self.macro_definitions() as macro_definitions:
-            entities.extend(
-                [
-                    Entity(
-                        md.name,
-                        md.body,
-                        type(md),
-                        md.get_position(macro_definitions),
-                        md.commented_out or not expand(md.body),
-                    )
-                    for md in macro_definitions
-                    if md.valid
+            for md, md_position in macro_definitions.with_positions():
+                if (
+                    md.valid
                     and not protected_regex.match(md.name)
                     and not md.name.endswith(")")  # skip macro definitions with options
-                ]
-            )
+                ):
+                    entities.append(
+                        _Entity(
+                            md.name,
+                            md.body,
+                            type(md),
+                            md_position,
+                            md.commented_out or not expand(md.body),
+                        )
+                    )
         with self.tags() as tags:
-            entities.extend(
-                [
-                    Entity(t.name.lower(), t.value, type(t), t.get_position(tags))
-                    for t in tags
-                    if t.valid and not protected_regex.match(t.name)
-                ]
-            )
+            # determine positions in a single pass rather than calling get_position()
+            # that is linear on its own
+            offset = 0
+            for t in tags:
+                comments_length = t.comments.get_raw_data_length()
+                tag_position = offset + comments_length
+                offset += comments_length + 1
+                if t.valid and not protected_regex.match(t.name):
+                    entities.append(
+                        _Entity(t.name.lower(), t.value, type(t), tag_position)
+                    )
         entities.sort(key=lambda e: e.position)
+        positions = [e.position for e in entities]
+
+        def get_referenced_names(nodes):
+            for node in nodes:
+                if isinstance(
+                    node,
+                    (
+                        MacroSubstitution,
+                        EnclosedMacroSubstitution,
+                        ConditionalMacroExpansion,
+                    ),
+                ):
+                    yield node.name
+                if isinstance(node, ConditionalMacroExpansion):
+                    yield from get_referenced_names(node.body)
+
+        # names (and lowercased names) of macros referenced from already examined values
+        references: Dict[str, Tuple[Set[str], Set[str]]] = {}
 
         def find_reference(entity, value):
-            def traverse(nodes):
-                for node in nodes:
-                    if isinstance(
-                        node,
-                        (
-                            MacroSubstitution,
-                            EnclosedMacroSubstitution,
-                            ConditionalMacroExpansion,
-                        ),
-                    ):
-                        if (
-                            entity.type == Tag
-                            and entity.name == node.name.lower()
-                            or entity.name == node.name
-                        ):
-                            return True
-                    if isinstance(node, ConditionalMacroExpansion):
-                        if traverse(node.body):
-                            return True
-                return False
-
-            return traverse(ValueParser.parse(value))
+            if value not in references:
+                names = set(get_referenced_names(ValueParser.parse(value)))
+                references[value] = names, {n.lower() for n in names}
+            names, lowercased_names = references[value]
+            if entity.type == Tag:
+                # tags can be referenced as %{tag} or %{TAG}
+                return entity.name in lowercased_names
+            return entity.name in names
 
         def update(value, requested_value, position):
             if value == requested_value:
                 # nothing to do
                 return requested_value
 
-            modifiable_entities = {
-                e.name
-                for e in entities
-                if e.position < position and (not e.flip_pending or e.disabled)
-            }
-            # tags can be referenced as %{tag} or %{TAG}
-            modifiable_entities.update(
-                e.name.upper()
-                for e in entities
-                if e.position < position and e.type == Tag
-            )
-            flippable_entities = {
-                e.name
-                for e in entities
-                if e.position < position
-                and e.type == MacroDefinition
-                and not e.flip_pending
-            }
+            # entities are sorted by position, find those preceding the value
+            preceding_entities = entities[: bisect.bisect_left(positions, position)]
+
+            modifiable_entities = set()
+            flippable_entities = set()
+            for e in preceding_entities:
+                if not e.flip_pending or e.disabled:
+                    modifiable_entities.add(e.name)
+                if e.type == Tag:
+                    # tags can be referenced as %{tag} or %{TAG}
+                    modifiable_entities.add(e.name.upper())
+                if e.type == MacroDefinition and not e.flip_pending:
+                    flippable_entities.add(e.name)
 
             # in case the value doesn't match after trying with flippable entities
             # do a second pass without them
@@ -851,17 +985,15 @@ class Specfile:
                     if grp.startswith(SUBSTITUTION_GROUP_PREFIX):
                         continue
                     # find the closest matching entity
-                    entity = [
+                    grp_lower = grp.lower()
+                    entity = next(
                         e
-                        for e in entities
-                        if e.position < position
-                        and (
-                            e.name == grp
-                            and e.type == MacroDefinition
-                            or e.name == grp.lower()
-                            and e.type == Tag
-                        )
-                    ][-1]
+                        for e in reversed(preceding_entities)
+                        if e.name == grp
+                        and e.type == MacroDefinition
+                        or e.name == grp_lower
+                        and e.type == Tag
+                    )
                     if entity.locked:
                         # avoid infinite recursion
                         return requested_value
@@ -874,32 +1006,37 @@ class Specfile:
                     finally:
                         entity.locked = False
                         entity.updated = True
-                for entity in entities:
-                    if entity.position < position and entity.name in entities_to_flip:
-                        entity.flip_pending = True
+                if entities_to_flip:
+                    for entity in preceding_entities:
+                        if entity.name in entities_to_flip:
+                            entity.flip_pending = True
                 return template.substitute(d)
             # no match, simply return the requested value
             return requested_value
 
         result = update(value, requested_value, position)
-        # synchronize back any changes
-        with self.macro_definitions() as macro_definitions:
-            for entity in entities:
-                if entity.type != MacroDefinition:
-                    continue
-                macro_definition = macro_definitions.get(entity.name, entity.position)
-                if entity.updated:
-                    macro_definition.body = entity.value
-                    macro_definition.commented_out = False
-                elif entity.flip_pending:
-                    macro_definition.commented_out = not entity.disabled
-        with self.tags() as tags:
-            for entity in entities:
-                if entity.type != Tag:
-                    continue
-                tag = tags.get(entity.name, entity.position)
-                if entity.updated:
-                    tag.value = entity.value
+        # synchronize back any changes, skip what hasn't been touched at all
+        macro_definition_entities = [
+            e
+            for e in entities
+            if e.type == MacroDefinition and (e.updated or e.flip_pending)
+        ]
+        tag_entities = [e for e in entities if e.type == Tag and e.updated]
+        if macro_definition_entities:
+            with self.macro_definitions() as macro_definitions:
+                for entity in macro_definition_entities:
+                    macro_definition = macro_definitions.get(
+                        entity.name, entity.position
+                    )
+                    if entity.updated:
+                        macro_definition.body = entity.value
+                        macro_definition.commented_out = False
+                    else:
+                        macro_definition.commented_out = not entity.disabled
+        if tag_entities:
+            with self.tags() as tags:
+                for entity in tag_entities:
+                    tags.get(entity.name, entity.position).value = entity.value
         return result
 
     def update_tag(
@@ -920,13 +1057,17 @@ class Specfile:
             tag = getattr(tags, name)
             original_value = tag.value
             position = tag.get_position(tags)
+        if original_value == value:
+            # nothing to do
+            return
         # we can't use update_value() within the context manager, because any changes
         # made by it to tags or macro definitions would be thrown away
         updated_value = self.update_value(
             original_value, value, position, protected_entities=protected_entities
         )
         with self.tags() as tags:
-            getattr(tags, name).value = updated_value
+            # the tag has already been looked up, use its position to get it directly
+            tags.get(name, position).value = updated_value
 
     def update_version(
         self,
@@ -981,10 +1122,9 @@ class Specfile:
             if not m:
                 update_macro(False)
                 return version
-            try:
-                base_end, suffix_start = m.span(1)
-            except IndexError:
+            if m.re.groups < 1:
                 raise SpecfileException("Invalid pre-release pattern")
+            base_end, suffix_start = m.span(1)
             update_macro(True)
             return version[:base_end] + "~" + version[suffix_start:]
 
@@ -1001,10 +1141,7 @@ class Specfile:
         Returns:
             Bumped release string.
         """
-        m = re.match(
-            r"^(?P<func>%release_func\s+)?(?P<pre>0\.)?(?P<rel>\d+)(?P<post>.*)$",
-            release_string,
-        )
+        m = RELEASE_NUMBER_REGEX.match(release_string)
         if m and (
             m.group("pre")
             or all(x not in m.group("post") for x in ["alpha", "beta", "rc"])
@@ -1015,7 +1152,7 @@ class Specfile:
                 + str(int(m.group("rel")) + 1)
                 + m.group("post")
             )
-        m = re.match(r"^(?P<pre>.+\.)(?P<rel>\d+)$", release_string)
+        m = TRAILING_RELEASE_NUMBER_REGEX.match(release_string)
         if m:
             return m.group("pre") + str(int(m.group("rel")) + 1)
         return release_string + ".1"
@@ -1026,7 +1163,9 @@ class Specfile:
         macro definitions that seem to define a release, then trying to update value
         of the Release tag.
         """
-        if self.has_autorelease:
+        # read the value only once, it requires parsing of tags
+        raw_release = self.raw_release
+        if self._contains_autorelease(raw_release):
             return
 
         with self.macro_definitions() as macro_definitions:
@@ -1035,4 +1174,4 @@ class Specfile:
                     md.body = self._bump_release_string(md.body)
                     return
 
-        self.raw_release = self._bump_release_string(self.raw_release)
+        self.raw_release = self._bump_release_string(raw_release)
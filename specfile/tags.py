@@ -2,7 +2,6 @@
 # SPDX-License-Identifier: MIT
 
 import copy
-import itertools
 import re
 from typing import (
     TYPE_CHECKING,
@@ -39,6 +38,19 @@ def get_tag_name_regex(name: str) -> str:
     return regex
 
 
+# compile the regexes only once, they are used for every tag and every line,
+# alternatives are ordered longest first, so that shorter names can't shadow longer ones
+_tag_names_regex = "|".join(
+    get_tag_name_regex(t) for t in sorted(TAG_NAMES, key=lambda t: (-len(t), t))
+)
+TAG_NAME_REGEX = re.compile(rf"(?:{_tag_names_regex})", re.IGNORECASE)
+TAG_REGEX = re.compile(
+    rf"^(?P<n>{_tag_names_regex})(?P<s>\s*:\s*)(?P<v>.+)", re.IGNORECASE
+)
+
+COMMENT_REGEX = re.compile(r"^(\s*#\s*)(.*)$")
+
+
 class Comment:
     """
     Class that represents a comment.
@@ -179,20 +191,27 @@ class Comments(UserList[Comment]):
         Returns:
             New instance of `Comments` class.
         """
-        comment_regex = re.compile(r"^(\s*#\s*)(.*)$")
         comments: List[Comment] = []
         preceding_lines: List[str] = []
+        # collect in reverse order and flip at the end, inserting at the head is slow
         for line in reversed(lines):
-            m = comment_regex.match(line)
-            if not m or preceding_lines:
-                preceding_lines.insert(0, line)
+            # once a non-comment line is found, all lines above it are preceding lines
+            m = None if preceding_lines else COMMENT_REGEX.match(line)
+            if not m:
+                preceding_lines.append(line)
                 continue
-            comments.insert(0, Comment(*reversed(m.groups())))
+            comments.append(Comment(*reversed(m.groups())))
+        comments.reverse()
+        preceding_lines.reverse()
         return cls(comments, preceding_lines)
 
     def get_raw_data(self) -> List[str]:
         return self._preceding_lines + [str(i) for i in self.data]
 
+    def get_raw_data_length(self) -> int:
+        """Gets length of raw data without constructing it."""
+        return len(self._preceding_lines) + len(self.data)
+
 
 class Tag:
     """
@@ -229,10 +248,10 @@ class Tag:
             suffix: Characters following the tag on a line.
             context: `Specfile` instance that defines the context for macro expansions.
         """
-        name_regexes = [
-            re.compile(get_tag_name_regex(t), re.IGNORECASE) for t in TAG_NAMES
-        ]
-        if not name or not any(r.match(name) for r in name_regexes):
+        # most names are plain tag names, try a set lookup before the regex
+        if not name or (
+            name.lower() not in TAG_NAMES and not TAG_NAME_REGEX.match(name)
+        ):
             raise ValueError(f"Invalid tag name: '{name}'")
         self.name = name
         self.value = value
@@ -297,10 +316,11 @@ class Tag:
         Returns:
             Position expressed as line number (starting from 0).
         """
+        # iterate over the underlying list, slicing the container creates a new one
         return sum(
-            len(t.comments.get_raw_data()) + 1
-            for t in container[: container.index(self)]
-        ) + len(self.comments.get_raw_data())
+            t.comments.get_raw_data_length() + 1
+            for t in container.data[: container.index(self)]
+        ) + self.comments.get_raw_data_length()
 
 
 class Tags(UserList[Tag]):
@@ -368,19 +388,14 @@ class Tags(UserList[Tag]):
             delimiter = []
             if preceding_lines and not preceding_lines[-1] or lines and not lines[0]:
                 delimiter.append("")
-            lines[:] = (
-                list(
-                    reversed(
-                        list(
-                            itertools.dropwhile(
-                                lambda line: not line, reversed(preceding_lines)
-                            )
-                        )
-                    )
-                )
-                + delimiter
-                + list(itertools.dropwhile(lambda line: not line, lines))
-            )
+            # strip trailing empty lines before and leading empty lines after the tag
+            end = len(preceding_lines)
+            while end > 0 and not preceding_lines[end - 1]:
+                end -= 1
+            start = 0
+            while start < len(lines) and not lines[start]:
+                start += 1
+            lines[:] = preceding_lines[:end] + delimiter + lines[start:]
 
         if isinstance(i, slice):
             for index in reversed(range(len(self.data))[i]):
@@ -394,7 +409,8 @@ class Tags(UserList[Tag]):
             data = super().__getattribute__("data")
         except AttributeError:
             return False
-        return any(t.name.lower() == cast(str, name).lower() for t in data)
+        name = cast(str, name).lower()
+        return any(t.name.lower() == name for t in data)
 
     def __getattr__(self, name: str) -> Tag:
         if name not in self:
@@ -447,8 +463,9 @@ class Tags(UserList[Tag]):
             ValueError: If there is no match.
         """
         first_match = None
+        name = name.capitalize()
         for i, tag in enumerate(self.data):
-            if tag.name.capitalize() == name.capitalize():
+            if tag.name.capitalize() == name:
                 if position is None:
                     if first_match is None:
                         first_match = i
@@ -496,13 +513,8 @@ class Tags(UserList[Tag]):
             else:
                 return line
 
-        def regex_pattern(tag):
-            name_regex = get_tag_name_regex(tag)
-            return rf"^(?P<n>{name_regex})(?P<s>\s*:\s*)(?P<v>.+)"
-
         macro_definitions = MacroDefinitions.parse(list(section))
         lines = process_conditions(list(section), macro_definitions, context)
-        tag_regexes = [re.compile(regex_pattern(t), re.IGNORECASE) for t in TAG_NAMES]
         data = []
         buffer: List[str] = []
         while lines:
@@ -512,8 +524,8 @@ class Tags(UserList[Tag]):
             if len(tokens) > 1:
                 line, ws, _ = tokens
             line, prefix, suffix = split_conditional_macro_expansion(line)
-            # find out if there is a match for one of the tag regexes
-            m = next((m for m in (r.match(line) for r in tag_regexes) if m), None)
+            # find out if there is a match for one of the tag names
+            m = TAG_REGEX.match(line)
             if m:
                 value = m.group("v")
                 if not suffix:
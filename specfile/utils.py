@@ -311,6 +311,9 @@ def split_conditional_macro_expansion(value: str) -> Tuple[str, str, str]:
         Tuple of body, prefix, suffix. Prefix and suffix will be empty if the passed string
         isn't a conditional macro expansion.
     """
+    if not value.startswith("%{") or not value.endswith("}"):
+        # no need to parse the value, it can't be a single macro expansion
+        return value, "", ""
     try:
         nodes = ValueParser.parse(value)
     except UnterminatedMacroException:
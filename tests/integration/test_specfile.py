@@ -3,6 +3,7 @@
 
 import copy
 import datetime
+from pathlib import Path
 
 import pytest
 import rpm
@@ -232,6 +233,16 @@ def test_add_changelog_entry(
         assert sections.changelog[: len(result)] == result
 
 
+def test_add_changelog_entry_parse_if_necessary(spec_minimal):
+    spec = Specfile(spec_minimal)
+    flexmock(SpecParser).should_call("_do_parse").never()
+    spec.add_changelog_entry(
+        "test", "Bill Packager", timestamp=datetime.date(2022, 2, 1)
+    )
+    with spec.changelog() as changelog:
+        assert changelog[-1].evr == "0.1-1"
+
+
 @pytest.mark.parametrize(
     "version, release",
     [
@@ -474,6 +485,37 @@ def test_update_tag(spec_macros):
     assert spec.version == "%{package_version}"
 
 
+def test_update_tag_same_value(spec_macros):
+    spec = Specfile(spec_macros)
+    flexmock(spec).should_receive("update_value").never()
+    spec.update_tag("Version", "%{package_version}")
+    assert spec.version == "%{package_version}"
+
+
+def test_update_tag_macro_redefined(tmp_path):
+    path = tmp_path / "test.spec"
+    path.write_text(
+        "Name:           test\n"
+        "%global ver 1.0\n"
+        "Version:        %{ver}\n"
+        "Release:        1\n"
+        "%global ver 2.0\n"
+        "Summary:        Test %{ver}\n"
+        "License:        MIT\n"
+        "\n"
+        "%description\n"
+        "Test package\n"
+    )
+    spec = Specfile(path)
+    spec.update_tag("Version", "3.0")
+    with spec.macro_definitions() as md:
+        assert md.get("ver", 1).body == "3.0"
+        assert md.get("ver", 4).body == "2.0"
+    assert spec.version == "%{ver}"
+    assert spec.summary == "Test %{ver}"
+    assert spec.expanded_version == "3.0"
+
+
 def test_multiple_instances(spec_minimal, spec_autosetup):
     spec1 = Specfile(spec_minimal)
     spec2 = Specfile(spec_autosetup)
@@ -592,6 +634,34 @@ def test_parse_if_necessary(spec_macros):
     assert spec.expanded_name == "test"
 
 
+def test_skip_parsing(spec_minimal):
+    flexmock(SpecParser).should_call("_do_parse").never()
+    spec = Specfile(spec_minimal, skip_parsing=True)
+    assert spec.version == "0.1"
+    spec.version = "0.2"
+    assert spec.version == "0.2"
+    flexmock(SpecParser).should_call("_do_parse").once()
+    assert spec.expanded_version == "0.2"
+
+
+def test_autosave_if_necessary(spec_minimal):
+    spec = Specfile(spec_minimal, autosave=True)
+    flexmock(Path).should_call("write_text").never()
+    assert spec.version == "0.1"
+    flexmock(Path).should_call("write_text").once()
+    spec.version = "0.2"
+    assert Specfile(spec_minimal).version == "0.2"
+    # modify the file externally
+    with open(spec_minimal, "a") as f:
+        f.write("\n")
+    flexmock(Path).should_call("write_text").once()
+    assert spec.version == "0.2"
+    assert spec_minimal.read_text() == str(spec)
+    # explicit save always writes
+    flexmock(Path).should_call("write_text").once()
+    spec.save()
+
+
 @pytest.mark.skipif(
     rpm.__version__ < "4.16",
     reason="condition expression evaluation requires rpm 4.16 or higher",
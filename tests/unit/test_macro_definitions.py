@@ -84,6 +84,27 @@ def test_get():
         macro_definitions.get("gittag")
 
 
+def test_with_positions():
+    macro_definitions = MacroDefinitions.parse(
+        [
+            "%global gitdate 20160901",
+            "",
+            "%global commit 9ab9717cf7d1be1a85b165a8eacb71b9e5831113",
+            "%define desc(x) Test spec file containing several \\",
+            "macro definitions in various formats (%?1)",
+            "# comment",
+            "%global shortcommit %(c=%{commit}; echo ${c:0:7})",
+        ]
+    )
+    assert [
+        (md.name, position) for md, position in macro_definitions.with_positions()
+    ] == [("gitdate", 0), ("commit", 2), ("desc(x)", 3), ("shortcommit", 6)]
+    assert all(
+        md.get_position(macro_definitions) == position
+        for md, position in macro_definitions.with_positions()
+    )
+
+
 def test_parse():
     macro_definitions = MacroDefinitions.parse(
         [
@@ -3,7 +3,14 @@
 
 import pytest
 
-from specfile.utils import EVR, NEVR, NEVRA, count_brackets, get_filename_from_location
+from specfile.utils import (
+    EVR,
+    NEVR,
+    NEVRA,
+    count_brackets,
+    get_filename_from_location,
+    split_conditional_macro_expansion,
+)
 
 
 @pytest.mark.parametrize(
@@ -49,6 +56,23 @@ def test_count_brackets(string, count):
     assert count_brackets(string) == count
 
 
+@pytest.mark.parametrize(
+    "value, result",
+    [
+        ("", ("", "", "")),
+        ("Version: 0.1", ("Version: 0.1", "", "")),
+        ("%{macro}", ("%{macro}", "", "")),
+        ("%{?fedora:Version: 0.1}", ("Version: 0.1", "%{?fedora:", "}")),
+        ("%{!?rhel:Version: 0.1}", ("Version: 0.1", "%{!?rhel:", "}")),
+        ("%{?fedora:Version: 0.1} ", ("%{?fedora:Version: 0.1} ", "", "")),
+        ("%{?fedora:a}%{?rhel:b}", ("%{?fedora:a}%{?rhel:b}", "", "")),
+        ("%{?fedora:a", ("%{?fedora:a", "", "")),
+    ],
+)
+def test_split_conditional_macro_expansion(value, result):
+    assert split_conditional_macro_expansion(value) == result
+
+
 def test_EVR_compare():
     assert EVR(version="0") == EVR(version="0")
     assert EVR(version="0", release="1") != EVR(version="0", release="2")